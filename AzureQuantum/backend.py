@@ -1,14 +1,17 @@
 from azure.quantum import Workspace
 from azure.quantum.qiskit import AzureQuantumProvider
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 # Add the qiskit-related directory to the path to import utils
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'qiskit-related'))
-from utils import get_local_aer_backend
+from utils import bitstrings_to_ints
 from qiskit.circuit.random import random_circuit
 import numpy as np
-from qiskit import transpile
-from qiskit.circuit import QuantumCircuit
+from qiskit.quantum_info import Operator
+
+# Ideal distributions already computed in this process, keyed by circuit fingerprint
+_ideal_cache = {}
 
 def get_available_backends_info(provider):
     """Print information about all available Azure Quantum backends."""
@@ -26,95 +29,217 @@ def get_available_backends_info(provider):
         print("-" * 40)
 
 
-def compute_ideal_distribution(qc, num_qubits, seed=42):
+def apply_gate(state, U, qubits, num_qubits):
+    """
+    Apply a k-qubit unitary to a statevector in place of a simulator call.
+    
+    Args:
+        state: Statevector reshaped to (2,) * num_qubits
+        U: Gate matrix of shape (2**k, 2**k) in Qiskit (little-endian) ordering
+        qubits: Indices of the k qubits the gate acts on, in gate-argument order
+        num_qubits: Number of qubits in the state
+    
+    Returns:
+        np.ndarray: Updated statevector of shape (2,) * num_qubits
+    """
+    k = len(qubits)
+    U = np.asarray(U).reshape((2,) * (2 * k))
+    # Qubit q lives on axis num_qubits-1-q; the gate's most significant
+    # argument comes first in the reshaped matrix axes
+    axes = [num_qubits - 1 - q for q in reversed(qubits)]
+    state = np.tensordot(U, state, axes=(list(range(k, 2 * k)), axes))
+    return np.moveaxis(state, list(range(k)), axes)
+
+
+def _param_key(param):
+    """Hashable stand-in for a gate parameter (float, ndarray or expression)."""
+    if isinstance(param, np.ndarray):
+        return (param.dtype.str, param.shape, param.tobytes())
+    try:
+        return float(param)
+    except TypeError:
+        return repr(param)
+
+
+def circuit_fingerprint(qc):
+    """
+    Build a hashable key identifying a circuit's gate sequence.
+    
+    Args:
+        qc: Quantum circuit
+    
+    Returns:
+        tuple: (name, qubit indices, params) for every instruction in qc
+    """
+    return tuple(
+        (instr.operation.name,
+         tuple(qc.find_bit(q).index for q in instr.qubits),
+         tuple(_param_key(p) for p in instr.operation.params))
+        for instr in qc.data
+    )
+
+
+def compute_ideal_distribution(qc, num_qubits):
     """
     Compute the ideal (noiseless) output distribution for a quantum circuit.
     
     Args:
         qc: Quantum circuit with measurements
         num_qubits: Number of qubits in the circuit
-        seed: Random seed for the simulator
     
     Returns:
-        dict: Ideal probability distribution {bitstring: probability}
+        np.ndarray: Ideal probabilities of length 2**num_qubits, indexed by integer bitstring
     """
-    # Prepare ideal (noiseless) simulation circuit (remove all measurements and classical registers)
-    qc_ideal = qc.remove_final_measurements(inplace=False)
-    qc_ideal_no_meas = QuantumCircuit(qc_ideal.num_qubits)
-    for instr in qc_ideal.data:
-        if instr.operation.name != "measure":
-            qc_ideal_no_meas.append(instr.operation, instr.qubits, instr.clbits)
+    # Reuse the distribution if this circuit was already simulated
+    key = (num_qubits, circuit_fingerprint(qc))
+    if key in _ideal_cache:
+        return _ideal_cache[key]
 
-    # Use the local AerSimulator from utils for ideal simulation
-    sim_backend = get_local_aer_backend(seed)
-    
-    # Transpile the circuit for the simulator
-    qc_ideal_t = transpile(qc_ideal_no_meas, sim_backend)
-    
-    # Run the simulation
-    result = sim_backend.run(qc_ideal_t).result()
-    psi = result.get_statevector(0)  # Specify experiment index 0
-    probs_ideal = np.abs(psi) ** 2
-    bitstrings = [format(i, f"0{num_qubits}b") for i in range(2 ** num_qubits)]
-    ideal_probs_dict = {b: probs_ideal[i] for i, b in enumerate(bitstrings)}
+    # Prepare ideal (noiseless) simulation circuit (remove final measurements and classical registers);
+    # any remaining mid-circuit measurements are skipped in the gate loop below
+    qc_ideal_no_meas = qc.remove_final_measurements(inplace=False)
+
+    # Evolve |0...0> directly in NumPy; for small circuits this avoids the
+    # transpile and AerSimulator setup cost that dominates the simulation
+    state = np.zeros((2,) * num_qubits, dtype=complex)
+    state[(0,) * num_qubits] = 1.0
+    unitaries = {}
+    for instr in qc_ideal_no_meas.data:
+        op = instr.operation
+        if op.name in ("barrier", "measure"):
+            continue
+        gate_key = (op.name, tuple(_param_key(p) for p in op.params))
+        if gate_key not in unitaries:
+            unitaries[gate_key] = Operator(op).data
+        qubits = [qc_ideal_no_meas.find_bit(q).index for q in instr.qubits]
+        state = apply_gate(state, unitaries[gate_key], qubits, num_qubits)
+
+    psi = state.ravel()
+    # |psi|^2 without the sqrt in np.abs, accumulated into a single buffer.
+    # float32 is ample for probabilities compared against ~1/sqrt(shots) noise.
+    re = psi.real.astype(np.float32)
+    im = psi.imag.astype(np.float32)
+    probs_ideal = np.multiply(re, re)
+    probs_ideal += im * im
+    # Callers share the cached array, so make sure none of them can modify it
+    probs_ideal.flags.writeable = False
+    _ideal_cache[key] = probs_ideal
     
-    return ideal_probs_dict
+    return probs_ideal
 
 
-def compute_xeb_score(exp_probs_dict, ideal_probs_dict, bitstrings):
+def compute_xeb_score(p_exp, p_ideal):
     """
     Compute the Cross-Entropy Benchmarking (XEB) score.
     
     Args:
-        exp_probs_dict: Experimental probability distribution
-        ideal_probs_dict: Ideal probability distribution
-        bitstrings: List of all possible bitstrings
+        p_exp: Experimental probabilities, indexed by integer bitstring
+        p_ideal: Ideal probabilities, indexed by integer bitstring
     
     Returns:
         float: XEB score
     """
     # XEB = sum_x p_exp(x) * p_ideal(x)
-    xeb = sum(exp_probs_dict.get(b, 0) * ideal_probs_dict.get(b, 0) for b in bitstrings)
-    return xeb
+    return float(np.dot(p_exp, p_ideal))
 
 
-def run_xeb_on_backend(qc, backend_name, provider, ideal_probs_dict, bitstrings, shots=1024):
+def submit_xeb(qc, backend_name, provider, shots=1024):
     """
-    Run XEB experiment on a specific backend.
+    Submit an XEB circuit to a backend without waiting for the result.
     
     Args:
         qc: Quantum circuit to run
         backend_name: Name of the backend
         provider: Azure Quantum provider
-        ideal_probs_dict: Ideal probability distribution
-        bitstrings: List of all possible bitstrings
         shots: Number of shots for the experiment
     
     Returns:
-        tuple: (xeb_score, exp_probs_dict) or (None, None) if failed
+        Job handle, or None if submission failed
+    """
+    try:
+        print(f"Submitting to backend: {backend_name}")
+        return provider.get_backend(backend_name).run(qc, shots=shots)
+    except Exception as e:
+        print(f"  Failed on backend {backend_name}: {e}")
+        return None
+
+
+def collect_xeb(job, backend_name, probs_ideal):
+    """
+    Wait for a submitted XEB job and compute its score.
+    
+    Args:
+        job: Job handle returned by submit_xeb (may be None)
+        backend_name: Name of the backend
+        probs_ideal: Ideal probabilities, indexed by integer bitstring
+    
+    Returns:
+        tuple: (xeb_score, p_exp) or (None, None) if failed, where p_exp holds
+        the measured probabilities indexed by integer bitstring
     """
+    if job is None:
+        return None, None
+    
     try:
-        print(f"Running on backend: {backend_name}")
-        job = provider.get_backend(backend_name).run(qc, shots=shots)
         result = job.result()
         counts_exp = result.get_counts()
-        total_counts = sum(counts_exp.values())
-        exp_probs_dict = {k: v / total_counts for k, v in counts_exp.items()}
         
-        xeb = compute_xeb_score(exp_probs_dict, ideal_probs_dict, bitstrings)
+        # Histogram the counts into a probability vector aligned with probs_ideal
+        state_ints = bitstrings_to_ints(counts_exp.keys())
+        vals = np.array(list(counts_exp.values()), dtype=np.float64)
+        p_exp = (np.bincount(state_ints, weights=vals, minlength=len(probs_ideal))
+                 / vals.sum()).astype(np.float32)
         
-        print(f"  XEB (Linear Cross-Entropy Benchmarking) score: {xeb:.4f}")
-        print(f"  Top measured bitstrings:")
-        for k, v in sorted(exp_probs_dict.items(), key=lambda x: -x[1])[:5]:
-            print(f"    {k}: {v:.4f}")
-        
-        return xeb, exp_probs_dict
+        xeb = compute_xeb_score(p_exp, probs_ideal)
+        return xeb, p_exp
         
     except Exception as e:
         print(f"  Failed on backend {backend_name}: {e}")
         return None, None
 
 
+def top_k_indices(probs, k=5):
+    """Indices of the k largest probabilities, most likely first."""
+    if len(probs) > k:
+        top = np.argpartition(-probs, k - 1)[:k]
+    else:
+        top = np.arange(len(probs))
+    return top[np.argsort(-probs[top], kind='stable')]
+
+
+def print_xeb_result(backend_name, xeb, p_exp):
+    """Print the XEB score and most frequent bitstrings for one backend."""
+    num_qubits = len(p_exp).bit_length() - 1
+    print(f"Backend: {backend_name}")
+    print(f"  XEB (Linear Cross-Entropy Benchmarking) score: {xeb:.4f}")
+    print(f"  Top measured bitstrings:")
+    for i in top_k_indices(p_exp):
+        if p_exp[i] == 0:
+            break
+        print(f"    {i:0{num_qubits}b}: {p_exp[i]:.4f}")
+
+
+def run_xeb_on_backend(qc, backend_name, provider, probs_ideal, shots=1024):
+    """
+    Run XEB experiment on a specific backend.
+    
+    Args:
+        qc: Quantum circuit to run
+        backend_name: Name of the backend
+        provider: Azure Quantum provider
+        probs_ideal: Ideal probabilities, indexed by integer bitstring
+        shots: Number of shots for the experiment
+    
+    Returns:
+        tuple: (xeb_score, p_exp) or (None, None) if failed
+    """
+    job = submit_xeb(qc, backend_name, provider, shots)
+    xeb, p_exp = collect_xeb(job, backend_name, probs_ideal)
+    if xeb is not None:
+        print_xeb_result(backend_name, xeb, p_exp)
+    return xeb, p_exp
+
+
 if __name__ == "__main__":
     # Set up your Azure Quantum workspace details
     resource_id = "/subscriptions/e4420dbb-ea34-41cf-b047-230c73836759/resourceGroups/AzureQuantum/providers/Microsoft.Quantum/Workspaces/hsunq"
@@ -144,27 +269,34 @@ if __name__ == "__main__":
     print(f"  Depth: {circuit_depth}")
     print(f"  Seed: {seed}")
 
-    # Compute ideal distribution using utils
+    # Compute ideal distribution
     print("\nComputing ideal (noiseless) distribution...")
-    ideal_probs_dict = compute_ideal_distribution(qc, num_qubits, seed)
-    bitstrings = [format(i, f"0{num_qubits}b") for i in range(2 ** num_qubits)]
+    probs_ideal = compute_ideal_distribution(qc, num_qubits)
     
     print(f"Top ideal bitstrings:")
-    for k, v in sorted(ideal_probs_dict.items(), key=lambda x: -x[1])[:5]:
-        print(f"  {k}: {v:.4f}")
+    for i in top_k_indices(probs_ideal):
+        print(f"  {i:0{num_qubits}b}: {probs_ideal[i]:.4f}")
 
     # Run XEB on all available backends
     print(f"\nPerforming XEB on all available backends (shots={shots}):\n")
     
+    # Submit to every backend up front and wait on all jobs concurrently, so the
+    # total wall-clock time is bounded by the slowest backend, not the sum
+    backend_names = [backend.name() for backend in provider.backends()]
+    with ThreadPoolExecutor(max_workers=max(1, len(backend_names))) as executor:
+        jobs = list(executor.map(
+            lambda name: submit_xeb(qc, name, provider, shots), backend_names
+        ))
+        outcomes = list(executor.map(
+            lambda args: collect_xeb(*args, probs_ideal), zip(jobs, backend_names)
+        ))
+    
     xeb_results = {}
-    for backend in provider.backends():
-        backend_name = backend.name()
-        xeb_score, exp_probs = run_xeb_on_backend(
-            qc, backend_name, provider, ideal_probs_dict, bitstrings, shots
-        )
+    for backend_name, (xeb_score, exp_probs) in zip(backend_names, outcomes):
         if xeb_score is not None:
+            print_xeb_result(backend_name, xeb_score, exp_probs)
             xeb_results[backend_name] = xeb_score
-        print("-" * 40)
+            print("-" * 40)
 
     # Summary of results
     print("\n" + "="*60)
@@ -18,18 +18,47 @@ from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator
 from qiskit_aer.noise import NoiseModel, depolarizing_error
 import itertools
+from functools import lru_cache
+from utils import bitstrings_to_ints
+
+
+# Transpiled measurement circuits, keyed by (circuit name, basis gates)
+_transpiled_circuits = {}
+
+
+@lru_cache(maxsize=None)
+def bit_masks(n_bits):
+    """
+    Bit matrix of all integer-encoded states.
+    
+    Args:
+        n_bits: Number of bits per encoded state
+    
+    Returns:
+        (2**n_bits, n_bits) array whose entry [s, q] is bit q of state s
+    """
+    states = np.arange(1 << n_bits)
+    return ((states[:, None] >> np.arange(n_bits)[None, :]) & 1).astype(np.float32)
 
 
 def create_crosstalk_backend(crosstalk_strength=0.02):
     """
     Create a backend with cross-talk noise between adjacent qubits.
     
+    Backends are cached per strength (rounded to 6 decimals), so repeated
+    sweeps share one AerSimulator instance per strength value.
+    
     Args:
         crosstalk_strength: Probability of crosstalk error (0-1)
     
     Returns:
         AerSimulator with cross-talk noise model
     """
+    return _build_crosstalk_backend(round(crosstalk_strength, 6))
+
+
+@lru_cache(maxsize=16)
+def _build_crosstalk_backend(crosstalk_strength):
     backend = AerSimulator()
     noise_model = NoiseModel()
     
@@ -39,6 +68,10 @@ def create_crosstalk_backend(crosstalk_strength=0.02):
     # Add cross-talk errors: when gate acts on qubit i, it can affect neighbors
     single_qubit_gates = ['x', 'y', 'z', 'h', 's', 't', 'sx', 'rz']
     
+    # Cross-talk: small depolarizing error on neighbor when gate acts on target.
+    # The error is identical everywhere, so build it once and share it.
+    crosstalk_error = depolarizing_error(crosstalk_strength, 1)
+    
     for target_qubit in range(n_qubits):
         # Find neighbors
         neighbors = []
@@ -48,16 +81,14 @@ def create_crosstalk_backend(crosstalk_strength=0.02):
             neighbors.append(target_qubit + 1)  # Right neighbor
         
         # For each gate on target_qubit, add errors to neighbors
-        for gate in single_qubit_gates:
-            for neighbor in neighbors:
-                # Cross-talk: small depolarizing error on neighbor when gate acts on target
-                crosstalk_error = depolarizing_error(crosstalk_strength, 1)
-                
-                # Apply error to neighbor when gate is applied to target
-                # Note: this adds error EVERY TIME the gate is applied
-                noise_model.add_quantum_error(crosstalk_error, gate, neighbor)
-    
-    backend.set_options(noise_model=noise_model)
+        for neighbor in neighbors:
+            # Apply error to neighbor when gate is applied to target, registering
+            # all single-qubit gates in one call
+            # Note: this adds error EVERY TIME the gate is applied
+            noise_model.add_quantum_error(crosstalk_error, single_qubit_gates, [neighbor])
+    
+    # Seed once at construction rather than on every run call
+    backend.set_options(noise_model=noise_model, seed_simulator=42)
     return backend
 
 
@@ -79,20 +110,13 @@ def create_crosstalk_measurement_circuits():
     operations = ['x', 'y', 'z', 'h', 's']
     
     for op in operations:
+        gate = getattr(QuantumCircuit, op)
+        
         # Circuit with operation on qubit 1
         qc = QuantumCircuit(3, 3)
         
         # Apply operation to middle qubit
-        if op == 'x':
-            qc.x(1)
-        elif op == 'y':
-            qc.y(1)
-        elif op == 'z':
-            qc.z(1)
-        elif op == 'h':
-            qc.h(1)
-        elif op == 's':
-            qc.s(1)
+        gate(qc, 1)
         
         qc.measure_all()
         circuits[f'{op}_on_q1'] = qc
@@ -100,16 +124,7 @@ def create_crosstalk_measurement_circuits():
         # Also create circuit with multiple operations (stress test)
         qc_multiple = QuantumCircuit(3, 3)
         for _ in range(10):  # Apply operation 10 times
-            if op == 'x':
-                qc_multiple.x(1)
-            elif op == 'y':
-                qc_multiple.y(1)
-            elif op == 'z':
-                qc_multiple.z(1)
-            elif op == 'h':
-                qc_multiple.h(1)
-            elif op == 's':
-                qc_multiple.s(1)
+            gate(qc_multiple, 1)
         
         qc_multiple.measure_all()
         circuits[f'{op}_10x_on_q1'] = qc_multiple
@@ -117,6 +132,36 @@ def create_crosstalk_measurement_circuits():
     return circuits
 
 
+def get_transpiled_circuits(circuits):
+    """
+    Transpile measurement circuits once and reuse them across noise sweeps.
+    
+    The noise model does not change transpilation, so circuits are compiled
+    against a plain AerSimulator and cached by name. Circuits that only use
+    instructions Aer supports natively are passed through untouched.
+    
+    Args:
+        circuits: Dictionary of quantum circuits
+    
+    Returns:
+        Dictionary of transpiled quantum circuits
+    """
+    reference_backend = AerSimulator()
+    basis_gates = tuple(sorted(reference_backend.operation_names))
+    
+    transpiled = {}
+    for circuit_name, circuit in circuits.items():
+        key = (circuit_name, basis_gates)
+        if key not in _transpiled_circuits:
+            if circuit.count_ops().keys() <= set(basis_gates):
+                _transpiled_circuits[key] = circuit
+            else:
+                _transpiled_circuits[key] = transpile(circuit, reference_backend)
+        transpiled[circuit_name] = _transpiled_circuits[key]
+    
+    return transpiled
+
+
 def simulate_crosstalk_effects(backend, circuits, shots=2000):
     """
     Simulate cross-talk effects using the provided backend and circuits.
@@ -130,26 +175,32 @@ def simulate_crosstalk_effects(backend, circuits, shots=2000):
         Dictionary of measurement results
     """
     results = {}
+    circuits = get_transpiled_circuits(circuits)
     
-    for circuit_name, circuit in circuits.items():
-        # Run circuit
-        job = backend.run(circuit, shots=shots, seed_simulator=42)
-        result = job.result()
-        counts = result.get_counts()
+    # Submit all circuits as a single job to amortize per-run overhead
+    job = backend.run(list(circuits.values()), shots=shots)
+    result = job.result()
+    
+    for i, (circuit_name, circuit) in enumerate(circuits.items()):
+        counts = result.get_counts(i)
+        
+        # Integer-encoded states (bit q = qubit q) and their counts
+        states = bitstrings_to_ints(counts.keys())
+        vals = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        
+        # Calculate probabilities as a dense vector indexed by integer state
+        total_shots = int(vals.sum())
+        probs = (np.bincount(states, weights=vals, minlength=1 << circuit.num_clbits)
+                 / total_shots).astype(np.float32)
         
-        # Calculate probabilities
-        total_shots = sum(counts.values())
-        probs = {state: count/total_shots for state, count in counts.items()}
+        # Error rate = probability of finding qubit in |1⟩ when it should be |0⟩;
+        # one matrix-vector product gives the rate for every bit at once
+        error_rates = probs @ bit_masks(circuit.num_clbits)
         
         # Calculate error rates for each qubit
         qubit_errors = {}
         for qubit in [0, 2]:  # Neighbors of qubit 1
-            # Error rate = probability of finding qubit in |1⟩ when it should be |0⟩
-            error_rate = 0
-            for state, prob in probs.items():
-                if len(state) > qubit and state[-(qubit+1)] == '1':  # Reverse bit order
-                    error_rate += prob
-            qubit_errors[f'qubit_{qubit}'] = error_rate
+            qubit_errors[f'qubit_{qubit}'] = float(error_rates[qubit])
         
         results[circuit_name] = {
             'counts': counts,
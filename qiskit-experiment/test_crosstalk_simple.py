@@ -9,82 +9,70 @@ sys.path.append('../qiskit-related')
 
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.transforms import offset_copy
 from qiskit import QuantumCircuit
 from qiskit_aer import AerSimulator
 import itertools
 
 
-def simulate_crosstalk_manually(gate_operations, crosstalk_strength=0.015, shots=4000):
+# Measurement strings (q2 q1 q0) for the joint neighbor outcomes
+# (no flip, q0 flipped, q2 flipped, both flipped)
+JOINT_OUTCOMES = ('000', '001', '100', '101')
+
+# Scenario count above which plot points are left unlabeled
+MAX_LABELED_SCENARIOS = 20
+
+
+def simulate_crosstalk_manually(gate_operations, crosstalk_strength=0.015, shots=4000, rng=None):
     """
     Manually simulate cross-talk effects using statistical modeling.
     
     Args:
-        gate_operations: List of gate types applied to target qubit
+        gate_operations: Dictionary of scenario names and gate counts on the target qubit
         crosstalk_strength: Cross-talk error probability per gate
         shots: Number of measurement shots to simulate
+        rng: np.random.Generator to sample from (default: np.random.default_rng())
     
     Returns:
         Measurement results with cross-talk effects
     """
     results = {}
     
-    # For each gate operation scenario
-    for scenario_name, num_gates in gate_operations.items():
-        # Simulate measurements on 3 qubits: [neighbor_0, target_1, neighbor_2]
-        
-        # Base error rates (readout, preparation errors, etc.)
-        base_error = 0.001  # 0.1% base error
-        
-        # Cross-talk probability depends on number of gates and strength
-        # Each gate on qubit 1 has probability of causing error on neighbors
-        neighbor_error_prob = 1 - (1 - crosstalk_strength) ** num_gates
-        
-        # Generate measurement outcomes
-        measurement_outcomes = []
-        
-        for shot in range(shots):
-            # Start with ideal state |000⟩ (all qubits in ground state)
-            qubit_states = [0, 0, 0]  # [q0, q1, q2]
-            
-            # Apply target gate effects to qubit 1
-            # (In real experiment, this would be the desired operation result)
-            # For simplicity, assume target operations return qubit 1 to |0⟩
-            
-            # Apply cross-talk errors to neighbors
-            for qubit in [0, 2]:  # Neighbors of qubit 1
-                # Each neighbor has probability of error due to cross-talk
-                if np.random.random() < neighbor_error_prob + base_error:
-                    qubit_states[qubit] = 1  # Flip to |1⟩
-            
-            # Convert to measurement string (q2 q1 q0 order)
-            outcome = f"{qubit_states[2]}{qubit_states[1]}{qubit_states[0]}"
-            measurement_outcomes.append(outcome)
-        
-        # Count measurement outcomes
-        counts = {}
-        for outcome in measurement_outcomes:
-            counts[outcome] = counts.get(outcome, 0) + 1
-        
-        # Calculate error rates for each qubit
-        qubit_errors = {}
-        total_shots = len(measurement_outcomes)
-        
-        for qubit_idx in [0, 2]:  # Only measure neighbors
-            error_count = 0
-            for outcome in measurement_outcomes:
-                # Check if this qubit is in |1⟩ (error state)
-                if outcome[2-qubit_idx] == '1':  # Reverse bit order
-                    error_count += 1
-            
-            error_rate = error_count / total_shots
-            qubit_errors[f'qubit_{qubit_idx}'] = error_rate
+    # Base error rates (readout, preparation errors, etc.)
+    base_error = 0.001  # 0.1% base error
+    
+    # Cross-talk probability depends on number of gates and strength
+    # Each gate on qubit 1 has probability of causing error on neighbors
+    scenario_names = list(gate_operations)
+    gate_counts = np.fromiter(gate_operations.values(), dtype=np.int64, count=len(scenario_names))
+    neighbor_error_probs = 1 - (1 - crosstalk_strength) ** gate_counts
+    
+    # Simulate measurements on 3 qubits: [neighbor_0, target_1, neighbor_2].
+    # Neighbor flips are independent with probability p, so the joint outcome
+    # histogram is multinomial over (none, q0 only, q2 only, both) and can be
+    # sampled directly instead of drawing every shot. Long gate sequences can push
+    # p past 1, which saturates at "always flip".
+    p = np.clip(neighbor_error_probs + base_error, 0.0, 1.0)
+    q = 1 - p
+    if rng is None:
+        rng = np.random.default_rng()
+    joint_counts = rng.multinomial(shots, np.stack([q * q, p * q, q * p, p * p], axis=-1))
+    
+    # Calculate error rates for each qubit from the joint histogram
+    rates = np.stack([joint_counts[:, 1] + joint_counts[:, 3],
+                      joint_counts[:, 2] + joint_counts[:, 3]], axis=-1) / shots
+    
+    for i, scenario_name in enumerate(scenario_names):
+        # Count measurement outcomes (q2 q1 q0 order; q1 stays |0⟩)
+        counts = {outcome: int(count) for outcome, count in zip(JOINT_OUTCOMES, joint_counts[i]) if count}
+        qubit_errors = {'qubit_0': float(rates[i, 0]), 'qubit_2': float(rates[i, 1])}
         
         results[scenario_name] = {
             'counts': counts,
             'qubit_errors': qubit_errors,
-            'total_shots': total_shots,
-            'expected_crosstalk': neighbor_error_prob,
-            'num_gates': num_gates
+            'total_shots': shots,
+            'expected_crosstalk': float(neighbor_error_probs[i]),
+            'num_gates': int(gate_counts[i])
         }
     
     return results
@@ -127,7 +115,8 @@ def analyze_crosstalk_measurements(results):
         'scenarios': list(results.keys()),
         'error_rates': {},
         'crosstalk_rates': {},
-        'statistics': {}
+        'statistics': {},
+        'table': {}
     }
     
     # Reference error rate
@@ -135,37 +124,47 @@ def analyze_crosstalk_measurements(results):
     ref_error_q0 = ref_errors.get('qubit_0', 0)
     ref_error_q2 = ref_errors.get('qubit_2', 0)
     
-    # Process each scenario
-    for scenario, data in results.items():
-        qubit_errors = data['qubit_errors']
-        
+    # Columnar view of all scenarios: one array per quantity
+    error_q0 = np.array([data['qubit_errors'].get('qubit_0', 0) for data in results.values()])
+    error_q2 = np.array([data['qubit_errors'].get('qubit_2', 0) for data in results.values()])
+    
+    # Calculate cross-talk rates (subtract reference)
+    crosstalk_q0 = np.maximum(0, error_q0 - ref_error_q0)
+    crosstalk_q2 = np.maximum(0, error_q2 - ref_error_q2)
+    
+    table = analysis['table']
+    table['scenario'] = np.array(analysis['scenarios'])
+    table['error_q0'] = error_q0
+    table['error_q2'] = error_q2
+    table['q0'] = crosstalk_q0
+    table['q2'] = crosstalk_q2
+    table['avg'] = (crosstalk_q0 + crosstalk_q2) / 2
+    table['expected'] = np.array([data.get('expected_crosstalk', 0) for data in results.values()])
+    table['num_gates'] = np.array([data.get('num_gates', 0) for data in results.values()])
+    
+    # Per-scenario view of the same values
+    for i, (scenario, data) in enumerate(results.items()):
         # Store raw error rates
-        analysis['error_rates'][scenario] = qubit_errors
-        
-        # Calculate cross-talk rates (subtract reference)
-        crosstalk_q0 = max(0, qubit_errors.get('qubit_0', 0) - ref_error_q0)
-        crosstalk_q2 = max(0, qubit_errors.get('qubit_2', 0) - ref_error_q2)
+        analysis['error_rates'][scenario] = data['qubit_errors']
         
         analysis['crosstalk_rates'][scenario] = {
-            'qubit_0': crosstalk_q0,
-            'qubit_2': crosstalk_q2,
-            'average': (crosstalk_q0 + crosstalk_q2) / 2,
-            'expected': data.get('expected_crosstalk', 0),
-            'num_gates': data.get('num_gates', 0)
+            'qubit_0': float(table['q0'][i]),
+            'qubit_2': float(table['q2'][i]),
+            'average': float(table['avg'][i]),
+            'expected': float(table['expected'][i]),
+            'num_gates': int(table['num_gates'][i])
         }
     
     # Calculate overall statistics
-    all_crosstalk_rates = []
-    for scenario, rates in analysis['crosstalk_rates'].items():
-        if scenario != 'reference':
-            all_crosstalk_rates.extend([rates['qubit_0'], rates['qubit_2']])
+    mask = table['scenario'] != 'reference'
+    all_crosstalk_rates = np.concatenate([table['q0'][mask], table['q2'][mask]])
     
-    if all_crosstalk_rates:
+    if all_crosstalk_rates.size:
         analysis['statistics'] = {
-            'mean_crosstalk': np.mean(all_crosstalk_rates),
-            'std_crosstalk': np.std(all_crosstalk_rates),
-            'min_crosstalk': np.min(all_crosstalk_rates),
-            'max_crosstalk': np.max(all_crosstalk_rates)
+            'mean_crosstalk': all_crosstalk_rates.mean(),
+            'std_crosstalk': all_crosstalk_rates.std(),
+            'min_crosstalk': all_crosstalk_rates.min(),
+            'max_crosstalk': all_crosstalk_rates.max()
         }
     
     return analysis
@@ -182,9 +181,11 @@ def plot_crosstalk_analysis(analysis, crosstalk_strength):
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
     
     # Plot 1: Error rates by scenario
-    scenarios = [s for s in analysis['scenarios'] if s != 'reference']
-    q0_errors = [analysis['error_rates'][s]['qubit_0'] for s in scenarios]
-    q2_errors = [analysis['error_rates'][s]['qubit_2'] for s in scenarios]
+    table = analysis['table']
+    mask = table['scenario'] != 'reference'
+    scenarios = table['scenario'][mask]
+    q0_errors = table['error_q0'][mask]
+    q2_errors = table['error_q2'][mask]
     
     x = np.arange(len(scenarios))
     width = 0.35
@@ -201,24 +202,31 @@ def plot_crosstalk_analysis(analysis, crosstalk_strength):
     ax1.grid(True, alpha=0.3)
     
     # Plot 2: Cross-talk vs number of gates
-    gate_counts = [analysis['crosstalk_rates'][s]['num_gates'] for s in scenarios]
-    avg_crosstalk = [analysis['crosstalk_rates'][s]['average'] for s in scenarios]
-    expected_rates = [analysis['crosstalk_rates'][s]['expected'] for s in scenarios]
+    gate_counts = table['num_gates'][mask]
+    avg_crosstalk = table['avg'][mask]
+    expected_rates = table['expected'][mask]
     
     # Sort by gate count for cleaner visualization
-    sorted_data = sorted(zip(gate_counts, avg_crosstalk, expected_rates, scenarios))
-    gate_counts_sorted, avg_crosstalk_sorted, expected_rates_sorted, scenarios_sorted = zip(*sorted_data)
+    order = np.lexsort((avg_crosstalk, gate_counts))
+    gate_counts_sorted = gate_counts[order]
+    avg_crosstalk_sorted = avg_crosstalk[order]
+    expected_rates_sorted = expected_rates[order]
+    scenarios_sorted = scenarios[order]
     
     ax2.scatter(gate_counts_sorted, avg_crosstalk_sorted, s=100, alpha=0.7, 
                label='Measured', color='blue')
     ax2.plot(gate_counts_sorted, expected_rates_sorted, 'r--', alpha=0.8, 
              label='Expected', linewidth=2)
     
-    # Add labels for each point
-    for i, scenario in enumerate(scenarios_sorted):
-        ax2.annotate(scenario.replace('_', '\n'), 
-                    (gate_counts_sorted[i], avg_crosstalk_sorted[i]),
-                    xytext=(5, 5), textcoords='offset points', fontsize=8)
+    # Add labels for each point (skipped for large sweeps, where per-label
+    # artists dominate drawing time)
+    label_points = len(scenarios) <= MAX_LABELED_SCENARIOS
+    if label_points:
+        # Shift labels 5 points up and right so they clear the markers
+        label_offset = offset_copy(ax2.transData, fig=fig, x=5, y=5, units='points')
+        for x_val, y_val, scenario in zip(gate_counts_sorted, avg_crosstalk_sorted, scenarios_sorted):
+            ax2.text(x_val, y_val, scenario.replace('_', '\n'), fontsize=8,
+                     transform=label_offset)
     
     ax2.set_xlabel('Number of Gates on Target Qubit')
     ax2.set_ylabel('Average Cross-talk Rate')
@@ -227,19 +235,21 @@ def plot_crosstalk_analysis(analysis, crosstalk_strength):
     ax2.grid(True, alpha=0.3)
     
     # Plot 3: Cross-talk symmetry (left vs right neighbor)
-    crosstalk_q0 = [analysis['crosstalk_rates'][s]['qubit_0'] for s in scenarios]
-    crosstalk_q2 = [analysis['crosstalk_rates'][s]['qubit_2'] for s in scenarios]
+    crosstalk_q0 = table['q0'][mask]
+    crosstalk_q2 = table['q2'][mask]
     
     ax3.scatter(crosstalk_q0, crosstalk_q2, s=100, alpha=0.7, c=range(len(scenarios)), 
                cmap='viridis')
     
     # Add scenario labels
-    for i, scenario in enumerate(scenarios):
-        ax3.annotate(scenario.replace('_', '\n'), (crosstalk_q0[i], crosstalk_q2[i]),
-                    xytext=(5, 5), textcoords='offset points', fontsize=8)
+    if label_points:
+        label_offset = offset_copy(ax3.transData, fig=fig, x=5, y=5, units='points')
+        for x_val, y_val, scenario in zip(crosstalk_q0, crosstalk_q2, scenarios):
+            ax3.text(x_val, y_val, scenario.replace('_', '\n'), fontsize=8,
+                     transform=label_offset)
     
     # Perfect symmetry line
-    max_rate = max(max(crosstalk_q0), max(crosstalk_q2))
+    max_rate = max(crosstalk_q0.max(), crosstalk_q2.max())
     if max_rate > 0:
         ax3.plot([0, max_rate], [0, max_rate], 'r--', alpha=0.5, label='Perfect symmetry')
     
@@ -7,71 +7,127 @@ Instead, we'll create a simple custom experiment.
 import sys
 sys.path.append('../qiskit-related')
 
+from functools import lru_cache
 import numpy as np
 import matplotlib.pyplot as plt
 from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import Parameter
 from qiskit_aer import AerSimulator
 from qiskit.visualization import plot_histogram
+from utils import fit_log_linear_decay, njit
 
 
-def create_t1_circuit(delay_time):
-    """Create a simple T1 measurement circuit."""
+def create_t1_template():
+    """Create a T1 measurement circuit with a symbolic delay parameter."""
+    delay = Parameter('delay')
     qc = QuantumCircuit(1, 1)
     
     # Prepare |1⟩ state
     qc.x(0)
     
     # Add delay
-    if delay_time > 0:
-        qc.delay(delay_time, 0, unit='s')
+    qc.delay(delay, 0, unit='s')
     
     # Measure
     qc.measure(0, 0)
     
-    return qc
+    return qc, delay
 
 
-def simulate_t1_decay(delay_times, t1_time, shots=1000):
+def create_t1_circuits(delay_times, backend=None):
+    """
+    Create T1 measurement circuits for a sweep of delays.
+    
+    The circuit is built (and transpiled for backend, if given) once, and
+    each delay is bound into a copy of it, so the whole list can go to a
+    single backend.run call.
+    """
+    qc, delay = create_t1_template()
+    if backend is not None:
+        qc = transpile(qc, backend)
+    return [qc.assign_parameters({delay: float(t)}, inplace=False) for t in delay_times]
+
+
+def create_t1_circuit(delay_time):
+    """Create a simple T1 measurement circuit."""
+    return create_t1_circuits([delay_time])[0]
+
+
+@lru_cache(maxsize=64)
+def _decay_curve(delay_bytes, t1_time):
+    """exp(-t/T1) for float64 delays given as raw bytes, cached across calls."""
+    curve = np.exp(-np.frombuffer(delay_bytes, dtype=np.float64) / t1_time)
+    curve.flags.writeable = False
+    return curve
+
+
+def _simulate_t1_counts(decay, shots, noise_level, rng):
+    """Sample |0⟩/|1⟩ counts for each delay; returns (counts_0, counts_1, prob_1)."""
+    # Theoretical probability plus some noise for realism, clamped to [0,1]
+    prob_1 = np.clip(decay + rng.normal(0.0, noise_level * decay), 0.0, 1.0)
+    
+    # Simulate shot noise for all delays in one draw
+    counts_1 = rng.binomial(shots, prob_1)
+    
+    return shots - counts_1, counts_1, counts_1 / shots
+
+
+def simulate_t1_decay(delay_times, t1_time, shots=1000, rng=None):
     """
     Simulate T1 decay using exponential decay formula.
     P(|1⟩) = exp(-t/T1)
+    
+    rng is a np.random.Generator; a fresh default_rng() is used if omitted.
     """
-    results = []
+    if rng is None:
+        rng = np.random.default_rng()
     
-    for delay_time in delay_times:
-        # Calculate theoretical probability
-        prob_1 = np.exp(-delay_time / t1_time)
-        
-        # Add some noise for realism
-        noise_level = 0.02  # 2% noise
-        prob_1 += np.random.normal(0, noise_level * prob_1)
-        prob_1 = max(0, min(1, prob_1))  # Clamp to [0,1]
-        
-        # Simulate shot noise
-        count_1 = np.random.binomial(shots, prob_1)
-        count_0 = shots - count_1
-        
-        results.append({
-            'counts': {'0': count_0, '1': count_1},
-            'prob_1': count_1 / shots
-        })
+    # Calculate theoretical probability (reused across sweeps over shots/noise)
+    delay_bytes = np.ascontiguousarray(delay_times, dtype=np.float64).tobytes()
+    decay = _decay_curve(delay_bytes, float(t1_time))
+    
+    noise_level = 0.02  # 2% noise
+    counts_0, counts_1, prob_1 = _simulate_t1_counts(decay, int(shots), noise_level, rng)
     
-    return results
+    return [
+        {'counts': {'0': int(c0), '1': int(c1)}, 'prob_1': float(p1)}
+        for c0, c1, p1 in zip(counts_0, counts_1, prob_1)
+    ]
+
+
+@njit(cache=True)
+def _decay_residuals(params, t, y):
+    """Residuals of A*exp(-t/T1) + B against y, for least_squares."""
+    return params[0] * np.exp(-t / params[1]) + params[2] - y
 
 
 def fit_exponential_decay(delays, probabilities):
     """Fit exponential decay to extract T1."""
-    from scipy.optimize import curve_fit
+    # Closed-form fit with B = 0 first; it returns None when the data are not
+    # a pure exponential decay (e.g. they level off at a nonzero floor)
+    fit = fit_log_linear_decay(delays, probabilities)
+    if fit is not None:
+        return fit
     
-    def exponential_decay(t, A, T1, B):
-        return A * np.exp(-t / T1) + B
+    # Fall back to the nonlinear fit, which also fits B
+    from scipy.optimize import least_squares
     
     try:
         # Initial guess: A=1, T1=50μs, B=0
-        p0 = [1.0, 50e-6, 0.0]
+        p0 = np.array([1.0, 50e-6, 0.0])
         
         # Fit the curve
-        popt, pcov = curve_fit(exponential_decay, delays, probabilities, p0=p0, maxfev=10000)
+        t = np.asarray(delays, dtype=np.float64)
+        y = np.asarray(probabilities, dtype=np.float64)
+        fit = least_squares(_decay_residuals, p0, args=(t, y), method='lm',
+                            x_scale='jac', max_nfev=10000)
+        if not fit.success:
+            raise RuntimeError(fit.message)
+        popt = fit.x
+        
+        # Covariance from the Jacobian, scaled by the residual variance
+        dof = max(len(y) - len(popt), 1)
+        pcov = np.linalg.inv(fit.jac.T @ fit.jac) * (2 * fit.cost / dof)
         
         A, T1_fit, B = popt
         T1_error = np.sqrt(pcov[1,1]) if pcov[1,1] > 0 else 0
@@ -9,9 +9,13 @@ the qiskit-experiments framework.
 import sys
 sys.path.append('../qiskit-related')
 
-from utils import get_local_aer_backend, get_least_busy_backend, get_simulator_backend
+from utils import (get_local_aer_backend, get_least_busy_backend, get_simulator_backend,
+                   get_excited_state_probabilities, get_thermal_noise_model,
+                   configure_plotting, run_t1_sweep, fast_fit_t1)
 from qiskit_experiments.library import T1
 import numpy as np
+
+SHOW_PLOTS = configure_plotting()
 import matplotlib.pyplot as plt
 
 def create_thermal_noise_backend(t1_time=50e-6):
@@ -19,39 +23,22 @@ def create_thermal_noise_backend(t1_time=50e-6):
     Create a backend with thermal relaxation noise using a more direct approach.
     """
     from qiskit_aer import AerSimulator
-    from qiskit_aer.noise import NoiseModel, thermal_relaxation_error
-    
-    # Create a basic AerSimulator
-    backend = AerSimulator()
-    
-    # Create a noise model based on our desired T1 time
-    noise_model = NoiseModel()
-    
-    # Set T2 = T1 (pure amplitude damping limit)
-    t2_time = t1_time
-    
-    # Gate time (typical duration)
-    gate_time = 100e-9  # 100 ns
     
-    # Add thermal relaxation to all qubits (limit to 5 for efficiency)
-    for qubit in range(5):
-        # For gates - use gate_time duration
-        thermal_error = thermal_relaxation_error(t1_time, t2_time, gate_time)
-        noise_model.add_quantum_error(thermal_error, ['x', 'sx', 'rz', 'id'], [qubit])
-        
-        # For delays - the actual delay duration will be used by the simulator
-        # We just need to register that delays should have thermal relaxation
-        delay_error = thermal_relaxation_error(t1_time, t2_time, 1e-6)  # 1μs as reference
-        noise_model.add_quantum_error(delay_error, ['delay'], [qubit])
-    
-    # Create simulator with our noise model
-    backend.set_options(noise_model=noise_model)
-    
-    return backend
+    # Thermal relaxation on 5 qubits (T2 = T1, 100 ns gates). The noise model
+    # is built once in utils and shared, so only the simulator is new per call.
+    return AerSimulator(noise_model=get_thermal_noise_model(t1_time))
 
 
-def run_t1_experiment(backend_type="local_noisy"):
-    """Run a T1 experiment on the specified backend."""
+def run_t1_experiment(backend_type="local_noisy", fast_fit=False):
+    """
+    Run a T1 experiment on the specified backend.
+    
+    Args:
+        backend_type: Which backend to run on
+        fast_fit: Skip the qiskit-experiments analysis and report T1 from
+            the closed-form log-linear fit (the analysis still runs if the
+            data are not a pure decay)
+    """
     
     print("="*60)
     print("SIMPLE T1 RELAXATION TIME MEASUREMENT")
@@ -64,7 +51,7 @@ def run_t1_experiment(backend_type="local_noisy"):
         expected_t1 = 50e-6  # seconds
     elif backend_type == "local_ideal":
         print("Using local ideal backend...")
-        backend = get_local_aer_backend()
+        backend = get_local_aer_backend(seed_simulator=42)
         expected_t1 = None  # No decoherence
     elif backend_type == "ibm_real":
         print("Using real IBM Quantum device...")
@@ -91,12 +78,14 @@ def run_t1_experiment(backend_type="local_noisy"):
     if expected_t1:
         print(f"Expected T1: {expected_t1*1e6:.1f} μs")
     
-    # Run experiment
+    # Run experiment and wait for completion
     print("\nRunning experiment...")
-    exp_data = t1_exp.run(backend, shots=2000, seed_simulator=42)
-    
-    # Wait for completion
-    exp_data.block_for_results()
+    exp_data = run_t1_sweep(t1_exp, backend, shots=2000, fast_fit=fast_fit)
+    fit = None
+    if fast_fit:
+        fit, exp_data = fast_fit_t1(t1_exp, exp_data, delays)
+        if fit is None:
+            print("Fast fit rejected (not a pure decay); used the full analysis")
     
     # Get results
     print("\n" + "="*50)
@@ -105,7 +94,14 @@ def run_t1_experiment(backend_type="local_noisy"):
     
     results = exp_data.analysis_results()
     
-    if results:
+    if fit is not None:
+        t1_measured, t1_std, _ = fit
+        print(f"Fast-fit T1: {t1_measured*1e6:.2f} ± {t1_std*1e6:.2f} μs")
+        if expected_t1:
+            error_pct = abs(t1_measured - expected_t1) / expected_t1 * 100
+            print(f"Expected T1: {expected_t1*1e6:.2f} μs")
+            print(f"Relative error: {error_pct:.1f}%")
+    elif results:
         for result in results:
             if result.name == "T1":
                 t1_measured = result.value  # in seconds
@@ -134,22 +130,16 @@ def run_t1_experiment(backend_type="local_noisy"):
         print("Plot saved as 't1_measurement_simple.png'")
         
         # Show the plot
-        plt.show()
+        if SHOW_PLOTS:
+            plt.show()
         
     except Exception as e:
         print(f"Plotting failed: {e}")
         
         # Try manual plot
         try:
-            data = exp_data.data()
             delays_us = delays * 1e6  # Convert to microseconds
-            
-            probs = []
-            for i, datum in enumerate(data):
-                counts = datum.counts
-                total = sum(counts.values())
-                prob_1 = counts.get('1', 0) / total if total > 0 else 0
-                probs.append(prob_1)
+            probs = get_excited_state_probabilities(exp_data.data())
             
             plt.figure(figsize=(10, 6))
             plt.plot(delays_us, probs, 'bo-', label='|1⟩ population')
@@ -160,7 +150,8 @@ def run_t1_experiment(backend_type="local_noisy"):
             plt.legend()
             plt.tight_layout()
             plt.savefig('t1_measurement_simple.png', dpi=300, bbox_inches='tight')
-            plt.show()
+            if SHOW_PLOTS:
+                plt.show()
             print("Manual plot saved as 't1_measurement_simple.png'")
             
         except Exception as e2:
@@ -171,5 +162,12 @@ def run_t1_experiment(backend_type="local_noisy"):
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure T1 with qiskit-experiments")
+    parser.add_argument("--fast-fit", action="store_true",
+                        help="report T1 from the closed-form fit instead of the framework analysis")
+    args = parser.parse_args()
+
     # Run the experiment
-    exp_data = run_t1_experiment(backend_type="local_noisy")
+    exp_data = run_t1_experiment(backend_type="local_noisy", fast_fit=args.fast_fit)
@@ -6,9 +6,12 @@ Working T1 relaxation time measurement using qiskit-experiments with proper nois
 import sys
 sys.path.append('../qiskit-related')
 
-from utils import get_local_aer_backend
+from utils import (get_local_aer_backend, get_excited_state_probabilities, get_thermal_noise_model,
+                   configure_plotting, run_t1_sweep, fast_fit_t1)
 from qiskit_experiments.library import T1
 import numpy as np
+
+SHOW_PLOTS = configure_plotting()
 import matplotlib.pyplot as plt
 
 
@@ -17,43 +20,20 @@ def create_proper_noise_backend(t1_time=50e-6):
     Create a backend with proper T1 relaxation for delay-based measurements.
     """
     from qiskit_aer import AerSimulator
-    from qiskit_aer.noise import NoiseModel, thermal_relaxation_error
-    
-    # Create base simulator
-    backend = AerSimulator()
-    
-    # Create noise model
-    noise_model = NoiseModel()
-    
-    # T1 and T2 times
-    t2_time = t1_time  # Pure T1 limit
-    
-    # For delay gates, we need to add thermal relaxation
-    # The duration will be handled by the experiment itself
-    n_qubits = 5  # Reasonable number for simulation
     
-    for qubit in range(n_qubits):
-        # Add thermal relaxation for delay instructions
-        # Use a reference time - the actual delay duration will scale this appropriately
-        ref_time = 1e-6  # 1 microsecond reference
-        thermal_error = thermal_relaxation_error(t1_time, t2_time, ref_time)
-        
-        # Apply to delay instructions
-        noise_model.add_quantum_error(thermal_error, ['delay'], [qubit])
-        
-        # Also add to basic gates for completeness
-        gate_time = 100e-9  # 100 ns gate time
-        gate_thermal_error = thermal_relaxation_error(t1_time, t2_time, gate_time)
-        noise_model.add_quantum_error(gate_thermal_error, ['x', 'sx', 'rz', 'id'], [qubit])
-    
-    # Configure the backend with the noise model
-    backend.set_options(noise_model=noise_model)
-    
-    return backend
+    # Pure T1 limit on 5 qubits, shared with the other T1 scripts through the
+    # cached noise model in utils
+    return AerSimulator(noise_model=get_thermal_noise_model(t1_time))
 
 
-def run_qiskit_experiments_t1():
-    """Run T1 experiment using qiskit-experiments framework."""
+def run_qiskit_experiments_t1(fast_fit=False):
+    """
+    Run T1 experiment using qiskit-experiments framework.
+    
+    Args:
+        fast_fit: Estimate T1 with utils.fast_fit_t1 instead of running
+            the experiment's curve-fit analysis, unless that fit is rejected
+    """
     
     print("="*70)
     print("QISKIT-EXPERIMENTS T1 MEASUREMENT")
@@ -79,10 +59,12 @@ def run_qiskit_experiments_t1():
     t1_exp = T1(physical_qubits=[0], delays=delays)
     
     print("\nRunning T1 experiment...")
-    exp_data = t1_exp.run(backend, shots=4000, seed_simulator=42)
-    
-    # Wait for completion and get results
-    exp_data.block_for_results()
+    exp_data = run_t1_sweep(t1_exp, backend, shots=4000, fast_fit=fast_fit)
+    fit = None
+    if fast_fit:
+        fit, exp_data = fast_fit_t1(t1_exp, exp_data, delays)
+        if fit is None:
+            print("Fast fit rejected (not a pure decay); falling back to the full analysis")
     
     print("\n" + "="*50)
     print("ANALYSIS RESULTS")
@@ -91,7 +73,13 @@ def run_qiskit_experiments_t1():
     # Get analysis results
     results = exp_data.analysis_results(dataframe=True)  # Use dataframe=True to avoid deprecation warning
     
-    if len(results) > 0:
+    if fit is not None:
+        t1_measured, t1_std, _ = fit
+        print(f"Fast-fit T1: {t1_measured*1e6:.2f} ± {t1_std*1e6:.2f} μs")
+        print(f"Expected T1: {expected_t1*1e6:.2f} μs")
+        error_pct = abs(t1_measured - expected_t1) / expected_t1 * 100
+        print(f"Relative error: {error_pct:.1f}%")
+    elif len(results) > 0:
         for _, result in results.iterrows():
             if result['name'] == 'T1':
                 t1_measured = result['value']  # Already in seconds
@@ -130,29 +118,18 @@ def run_qiskit_experiments_t1():
             plt.savefig('t1_qiskit_experiments.png', dpi=300, bbox_inches='tight')
         
         print("Plot saved as 't1_qiskit_experiments.png'")
-        plt.show()
+        if SHOW_PLOTS:
+            plt.show()
         
     except Exception as e:
         print(f"Built-in plotting failed: {e}")
         
         # Manual plotting fallback
         try:
-            data = exp_data.data()
             delays_us = delays * 1e6
             
             # Extract probabilities from measurement data
-            probs = []
-            for i, datum in enumerate(data):
-                if hasattr(datum, 'counts'):
-                    counts = datum.counts
-                elif hasattr(datum, 'data') and hasattr(datum.data, 'counts'):
-                    counts = datum.data.counts
-                else:
-                    counts = {'0': 1000, '1': 1000}  # Fallback
-                
-                total = sum(counts.values())
-                prob_1 = counts.get('1', 0) / total if total > 0 else 0
-                probs.append(prob_1)
+            probs = get_excited_state_probabilities(exp_data.data())
             
             # Create manual plot
             plt.figure(figsize=(10, 6))
@@ -175,7 +152,8 @@ def run_qiskit_experiments_t1():
             plt.legend()
             plt.tight_layout()
             plt.savefig('t1_qiskit_experiments_manual.png', dpi=300, bbox_inches='tight')
-            plt.show()
+            if SHOW_PLOTS:
+                plt.show()
             print("Manual plot saved as 't1_qiskit_experiments_manual.png'")
             
         except Exception as e2:
@@ -191,4 +169,11 @@ def run_qiskit_experiments_t1():
 
 
 if __name__ == "__main__":
-    exp_data = run_qiskit_experiments_t1()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="T1 measurement with a thermal relaxation noise model")
+    parser.add_argument("--fast-fit", action="store_true",
+                        help="estimate T1 with the closed-form fit, falling back to the framework analysis")
+    args = parser.parse_args()
+
+    exp_data = run_qiskit_experiments_t1(fast_fit=args.fast_fit)
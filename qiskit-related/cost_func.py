@@ -1,10 +1,10 @@
+import numpy as np
 
+from utils import njit
 
-def cost_func_estimator(params, ansatz, hamiltonian, estimator):
+def cost_func_estimator(params, ansatz, isa_hamiltonian, estimator):
 
-    # transform the observable defined on virtual qubits to
-    # an observable defined on all physical qubits
-    isa_hamiltonian = hamiltonian.apply_layout(ansatz.layout)
+    # isa_hamiltonian is already laid out on the physical qubits of ansatz
 
     pub = (ansatz, isa_hamiltonian, params)
     job = estimator.run([pub])
@@ -12,15 +12,23 @@ def cost_func_estimator(params, ansatz, hamiltonian, estimator):
     results = job.result()[0]
     cost = results.data.evs
 
+    # remember the latest evaluated point and its cost so callbacks can log it
+    # without rerunning; callers must check the point is the one they accepted
+    cost_func_estimator.last = (np.copy(params), cost)
+
     return cost
 
+cost_func_estimator.last = (None, None)
+
 def cost_func_vqe(parameters, ansatz, hamiltonian, estimator):
     """Return estimate of energy from estimator
 
     Parameters:
         params (ndarray): Array of ansatz parameters
         ansatz (QuantumCircuit): Parameterized ansatz circuit
-        hamiltonian (SparsePauliOp): Operator representation of Hamiltonian
+        hamiltonian (SparsePauliOp or list): Operator representation of Hamiltonian,
+            or its pre-computed commuting groups, already laid out on the ansatz
+            (apply_layout is never called here)
         estimator (Estimator): Estimator primitive instance
 
     Returns:
@@ -30,10 +38,17 @@ def cost_func_vqe(parameters, ansatz, hamiltonian, estimator):
     estimator_job = estimator.run([(ansatz, hamiltonian, [parameters])])
     estimator_result = estimator_job.result()[0]
 
-    cost = estimator_result.data.evs[0]
+    # One expectation value per commuting group (or a single one); the energy is their sum
+    cost = estimator_result.data.evs.sum()
     return cost
 
-import numpy as np
+@njit(cache=True)
+def _weighted_energy_sum(energies, weights):
+    # Deterministic numeric reduction of the SSVQE cost, kept out of Python
+    total = 0.0
+    for i in range(energies.size):
+        total += energies[i] * weights[i]
+    return total
 
 def cost_func_ssvqe(params, initialized_anastz_list, weights, ansatz, hamiltonian, estimator):
     # """Return estimate of energy from estimator
@@ -50,9 +65,13 @@ def cost_func_ssvqe(params, initialized_anastz_list, weights, ansatz, hamiltonia
     #     float: Weighted energy estimate
     # """
 
-    energies = []
-
     # Define SSVQE
+    # One pub per initialized ansatz, all submitted in a single job. The
+    # hamiltonian is expected to already carry the transpiled layout.
+    pubs = [(ansatz_i, hamiltonian, [params]) for ansatz_i in initialized_anastz_list]
+    job = estimator.run(pubs)
+
+    energies = np.array([result.data.evs[0] for result in job.result()], dtype=np.float64)
 
-    weighted_energy_sum = np.dot(energies, weights)
+    weighted_energy_sum = _weighted_energy_sum(energies, np.asarray(weights, dtype=np.float64))
     return weighted_energy_sum
\ No newline at end of file
@@ -20,7 +20,6 @@ def plot_final_distribution(final_distribution_int):
 # plot_final_distribution(final_distribution_int)
 
 def plot_objective_function_values(objective_func_vals):
-    import matplotlib.pyplot as plt
     plt.plot(objective_func_vals)
     plt.xlabel("Iteration")
     plt.ylabel("Cost")
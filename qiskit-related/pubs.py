@@ -34,12 +34,9 @@ layout = transpiled_circuit.layout
 # Now define a sweep over parameter values, the last axis of dimension 2 is
 # for the two parameters "a" and "b"
 n = 10
-params = np.vstack(
-    [
-        np.linspace(-np.pi, np.pi, n),
-        np.linspace(-4 * np.pi, 4 * np.pi, n),
-    ]
-).T
+params = np.empty((n, 2))
+params[:, 0] = np.linspace(-np.pi, np.pi, n)
+params[:, 1] = np.linspace(-4 * np.pi, 4 * np.pi, n)
  
 # Define three observables. The inner length-1 lists cause this array of
 # observables to have shape (3, 1), rather than shape (3,) if they were
@@ -65,13 +62,11 @@ estimator_pub = (transpiled_circuit, observables, params)
 # Instantiate the new estimator object, then run the transpiled circuit
 # using the set of parameters and observables.
 estimator = Estimator(mode=backend)
-job1 = estimator.run([estimator_pub, estimator_pub])
-job2 = estimator.run([estimator_pub, estimator_pub])
-result1 = job1.result()
-result2 = job2.result()
+# A single pub already sweeps every parameter/observable combination, so one
+# job is enough.
+job = estimator.run([estimator_pub])
+result = job.result()
 
 # Print the result object to inspect its structure
 # print(result.__dict__)
-print(result1._pub_results[0].data.evs)
-print(result2._pub_results[0].data.evs)
-# print(result._pub_results[0].data.evs)
\ No newline at end of file
+print(result[0].data.evs)
@@ -9,7 +9,7 @@ from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
 from qiskit_ibm_runtime import Session, EstimatorV2 as Estimator
 from scipy.optimize import minimize
 
-from utils import get_least_busy_backend, get_simulator_backend, get_local_aer_backend
+from utils import get_least_busy_backend, get_simulator_backend, get_local_aer_backend, is_local_aer_backend, bitstrings_to_ints
 from plot import plot_objective_function_values, plot_final_distribution
 
 def create_graph(n, edge_list):
@@ -24,14 +24,20 @@ def build_max_cut_paulis(graph: rx.PyGraph) -> list[tuple[str, float]]:
 
     This function does the inverse of `build_max_cut_graph`
     """
-    pauli_list = []
-    for edge in list(graph.edge_list()):
-        paulis = ["I"] * len(graph)
-        paulis[edge[0]], paulis[edge[1]] = "Z", "Z"
+    n = len(graph)
+    edge_list = list(graph.edge_list())
+    edges = np.array(edge_list, dtype=np.int64).reshape(-1, 2)
+    weights = [graph.get_edge_data(u, v) for u, v in edge_list]
 
-        weight = graph.get_edge_data(edge[0], edge[1])
+    # One row of Pauli characters per edge; qubit q sits at column n-1-q so the
+    # strings come out already in Qiskit's little-endian order
+    chars = np.full((len(edges), n), ord("I"), dtype=np.uint8)
+    rows = np.arange(len(edges))
+    chars[rows, n - 1 - edges[:, 0]] = ord("Z")
+    chars[rows, n - 1 - edges[:, 1]] = ord("Z")
+    paulis = chars.view(f"S{n}").ravel().astype(str)
 
-        pauli_list.append(("".join(paulis)[::-1], weight))
+    pauli_list = list(zip(paulis.tolist(), weights))
 
     return pauli_list
 
@@ -43,19 +49,24 @@ def sample_circuit(circuit, backend):
     sampler = Sampler(mode=backend)
     sampler.options.default_shots = 10000
 
-    # Set simple error suppression/mitigation options
-    sampler.options.dynamical_decoupling.enable = True
-    sampler.options.dynamical_decoupling.sequence_type = "XY4"
-    sampler.options.twirling.enable_gates = True
-    sampler.options.twirling.num_randomizations = "auto"
+    # Set simple error suppression/mitigation options (hardware only, on a
+    # local simulator they just multiply the executed circuits)
+    if not is_local_aer_backend(backend):
+        sampler.options.dynamical_decoupling.enable = True
+        sampler.options.dynamical_decoupling.sequence_type = "XY4"
+        sampler.options.twirling.enable_gates = True
+        sampler.options.twirling.num_randomizations = "auto"
 
     pub= (circuit, )
     job = sampler.run([pub], shots=int(1e4))
-    counts_int = job.result()[0].data.meas.get_int_counts()
-    counts_bin = job.result()[0].data.meas.get_counts()
-    shots = sum(counts_int.values())
-    # change final_distribution_int to a dict with keys as bitstrings
-    final_distribution_int = {int(k, 2): v / shots for k, v in counts_bin.items()}
+    meas = job.result()[0].data.meas
+    counts_bin = meas.get_counts()
+    shots = meas.num_shots
+    # change final_distribution_int to a dict with integer keys, decoding all
+    # bitstrings in one vectorized pass
+    int_keys = bitstrings_to_ints(counts_bin.keys())
+    vals = np.fromiter(counts_bin.values(), dtype=np.int64, count=len(counts_bin))
+    final_distribution_int = dict(zip(int_keys.tolist(), (vals / shots).tolist()))
     plot_final_distribution(final_distribution_int)
 
 def test_run_qaoa_circuit(init_params, backend, cost_hamiltonian, isa_circuit):
@@ -65,26 +76,36 @@ def test_run_qaoa_circuit(init_params, backend, cost_hamiltonian, isa_circuit):
     # Define a local list to store costs
     objective_func_vals = []
 
+    # transform the observable defined on virtual qubits to an observable
+    # defined on all physical qubits, once for the whole optimization
+    isa_hamiltonian = cost_hamiltonian.apply_layout(isa_circuit.layout)
+
     def callback(params):
-        # Evaluate and store the cost at current params
-        cost = cost_func_estimator(params, isa_circuit, cost_hamiltonian, estimator)
-        objective_func_vals.append(cost)
+        # Reuse the latest evaluation instead of running another job, but only
+        # when it is the accepted point: COBYLA may have evaluated a trial
+        # point last, and logging that would stray from the optimizer's path
+        last_params, last_cost = cost_func_estimator.last
+        if last_params is None or not np.array_equal(last_params, params):
+            last_cost = cost_func_estimator(params, isa_circuit, isa_hamiltonian, estimator)
+        objective_func_vals.append(last_cost)
 
     with Session(backend=backend) as session:
         # If using qiskit-ibm-runtime<0.24.0, change `mode=` to `session=`
         estimator = Estimator(mode=session)
         estimator.options.default_shots = 1000
 
-        # Set simple error suppression/mitigation options
-        estimator.options.dynamical_decoupling.enable = True
-        estimator.options.dynamical_decoupling.sequence_type = "XY4"
-        estimator.options.twirling.enable_gates = True
-        estimator.options.twirling.num_randomizations = "auto"
+        # Set simple error suppression/mitigation options (hardware only, on a
+        # local simulator they just multiply the executed circuits)
+        if not is_local_aer_backend(backend):
+            estimator.options.dynamical_decoupling.enable = True
+            estimator.options.dynamical_decoupling.sequence_type = "XY4"
+            estimator.options.twirling.enable_gates = True
+            estimator.options.twirling.num_randomizations = "auto"
         # Run the optimizer with the callback
         result = minimize(
             cost_func_estimator,
             init_params,
-            args=(isa_circuit, cost_hamiltonian, estimator),
+            args=(isa_circuit, isa_hamiltonian, estimator),
             method="COBYLA",
             tol=1e-2,
             callback=callback
@@ -108,16 +129,22 @@ def test_solve_max_cut_by_qaoa():
     qaoa_round = 5
     circuit = QAOAAnsatz(cost_operator=cost_hamiltonian, reps=qaoa_round)
     circuit.measure_all()
-    backend = get_local_aer_backend()
-    pm = generate_preset_pass_manager(backend=backend, optimization_level=3)
-    isa_circuit = pm.run(circuit)
+    backend = get_local_aer_backend(seed_simulator=42)
+    # The parameterized circuit only needs a cheap transpile for the optimizer
+    # loop; the expensive passes are saved for the final bound circuit.
+    pm_fast = generate_preset_pass_manager(backend=backend, optimization_level=1)
+    pm_final = generate_preset_pass_manager(backend=backend, optimization_level=3)
+    isa_circuit = pm_fast.run(circuit)
     # isa_circuit.draw('mpl', fold=False, idle_wires=False)
     initial_gamma = np.pi
     initial_beta = np.pi/2
     # init_params for 5 layers qaoa circuit
     init_params = [initial_gamma, initial_beta] * qaoa_round
     result = test_run_qaoa_circuit(init_params, backend, cost_hamiltonian, isa_circuit)
-    optimized_circuit = isa_circuit.assign_parameters(result.x)
+    # Bind the final parameters on a single copy rather than rebuilding the circuit
+    bound_circuit = isa_circuit.copy()
+    bound_circuit.assign_parameters(result.x, inplace=True)
+    optimized_circuit = pm_final.run(bound_circuit)
     optimized_circuit.draw('mpl', fold=False, idle_wires=False)
     sample_circuit(optimized_circuit, backend)
 
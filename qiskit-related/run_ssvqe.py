@@ -15,15 +15,12 @@ from qiskit_ibm_runtime import SamplerOptions, EstimatorOptions
 from qiskit_ibm_runtime import Session
 from qiskit_ibm_runtime import options
 
-from utils import optimize_circuit_on_backend
+from utils import optimize_circuit_on_backend, is_local_aer_backend, pick_best_pair
 
-def ansatz_vqe_sample():
+def ansatz_ssvqe_sample(num_states=2):
 
     observable=SparsePauliOp.from_list([("II", 2), ("XX", -2), ("YY", 3), ("ZZ", -3)])
 
-    reference_circuit = QuantumCircuit(2)
-    reference_circuit.x(0)
-
     variational_form = TwoLocal(
         2,
         rotation_blocks=["rz", "ry"],
@@ -31,46 +28,75 @@ def ansatz_vqe_sample():
         entanglement="linear",
         reps=1,
     )
-    ansatz = reference_circuit.compose(variational_form)
 
-    # ansatz.decompose().draw('mpl')
-    ansatz.measure_active()
+    # SSVQE starts the same variational form from mutually orthogonal references,
+    # here the computational basis states |0>, |1>, ... (bit q -> qubit q)
+    initialized_anastz_list = []
+    for state in range(num_states):
+        reference_circuit = QuantumCircuit(2)
+        for qubit in range(2):
+            if state >> qubit & 1:
+                reference_circuit.x(qubit)
+        initialized_anastz_list.append(reference_circuit.compose(variational_form))
+
+    # Strictly decreasing weights make the k-th reference converge to the k-th eigenstate
+    weights = np.arange(num_states, 0, -1, dtype=np.float64)
 
-    return ansatz, observable
+    return initialized_anastz_list, weights, variational_form, observable
 
 
 
 def main():
 
-    ansatz, observable = ansatz_vqe_sample()
-    print(ansatz.decompose())
+    initialized_anastz_list, weights, ansatz, observable = ansatz_ssvqe_sample()
+    print(initialized_anastz_list[0].decompose())
 
     from utils import get_least_busy_backend, get_simulator_backend, get_local_aer_backend
     # backend = get_least_busy_backend()
     # backend = get_simulator_backend()
-    backend = get_local_aer_backend()
+    backend = get_local_aer_backend(seed_simulator=42)
 
     print(backend)
-    isa_ansatz, isa_observable = optimize_circuit_on_backend(ansatz, observable, backend)
+    # Place every initialized ansatz on the same qubits so a single laid-out
+    # observable serves all of them
+    initial_layout = pick_best_pair(backend)
+    isa_pairs = [
+        optimize_circuit_on_backend(circuit, observable, backend, optimization_level=1, initial_layout=initial_layout)
+        for circuit in initialized_anastz_list
+    ]
+    isa_ansatz_list = [isa_ansatz for isa_ansatz, _ in isa_pairs]
+    isa_observable = isa_pairs[0][1]
+    assert all(obs == isa_observable for _, obs in isa_pairs)
 
     # bootstrap strategy [TODO]
     # x0 = [0.1] * ansatz.num_parameters
     x0 = np.random.uniform(low=-np.pi, high=np.pi, size=ansatz.num_parameters)
 
-    sampler_options = options.SamplerOptions(default_shots=32)
-    estimator_options = options.EstimatorOptions(default_shots=32)
-
     from cost_func import cost_func_ssvqe
 
-    with Session(backend=backend) as session:
-        sampler = Sampler(mode=session, options=sampler_options)
-        estimator = Estimator(mode=session, options=estimator_options)
+    if is_local_aer_backend(backend):
+        # Noiseless local run: exact expectation values straight from the
+        # statevector, with no sampling, Session or Runtime serialization
+        estimator = StatevectorEstimator()
 
-        # Optimize the parameters using COBYLA
-        # result = minimize(cost_func_vqe, x0, method="COBYLA")
-        result = minimize(cost_func_ssvqe, x0, args=(isa_ansatz, isa_observable, estimator), method="COBYLA")
+        result = minimize(cost_func_ssvqe, x0, args=(isa_ansatz_list, weights, ansatz, isa_observable, estimator),
+                          method="COBYLA")
 
         optimized_parameters = result.x
+    else:
+        sampler_options = options.SamplerOptions(default_shots=32)
+        estimator_options = options.EstimatorOptions(default_shots=32)
+
+        with Session(backend=backend) as session:
+            sampler = Sampler(mode=session, options=sampler_options)
+            estimator = Estimator(mode=session, options=estimator_options)
+
+            # Optimize the parameters using COBYLA
+            # result = minimize(cost_func_vqe, x0, method="COBYLA")
+            result = minimize(cost_func_ssvqe, x0, args=(isa_ansatz_list, weights, ansatz, isa_observable, estimator),
+                              method="COBYLA")
+
+            optimized_parameters = result.x
 
     print("Optimized Parameters:", optimized_parameters)
 
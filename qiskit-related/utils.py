@@ -1,18 +1,37 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
 
+import numpy as np
+from qiskit import qpy
+from qiskit.circuit.library import get_standard_gate_name_mapping
 from qiskit_ibm_runtime import QiskitRuntimeService
 from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
 
+try:
+    from numba import njit
+except ImportError:
+    # Without numba, kernels decorated with njit simply run as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+TRANSPILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vqe_transpile")
+
+@lru_cache(maxsize=1)
+def _service():
+    # Load credentials and connect only once per process
+    return QiskitRuntimeService(channel='ibm_quantum')
+
 def get_least_busy_backend():
 
-    service = QiskitRuntimeService(channel='ibm_quantum')
-    backend = service.least_busy(operational=True, simulator=False)
+    backend = _service().least_busy(operational=True, simulator=False)
 
     return backend
 
 def get_simulator_backend():
-    service = QiskitRuntimeService(channel='ibm_quantum')
     # Use a simulator backend instead of the least busy real device
-    backend = service.backend("ibmq_qasm_simulator")
+    backend = _service().backend("ibmq_qasm_simulator")
     return backend
 
 def get_local_aer_backend(seed_simulator):
@@ -26,12 +45,229 @@ def get_local_aer_backend(seed_simulator):
     )
     # return Aer.get_backend("aer_simulator", seed_simulator=seed_simulator, method="statevector")
     # return Aer.get_backend(seed_simulator=seed_simulator, method="statevector")
-    return AerSimulator(method="statevector", seed_simulator=seed_simulator)
+    # Let Aer pick the cheapest method for each circuit (e.g. stabilizer for
+    # Clifford-only circuits) and keep only counts, not per-shot memory
+    return AerSimulator(method="automatic", seed_simulator=seed_simulator, memory=False)
+
+def bitstrings_to_ints(bitstrings):
+    """
+    Parse measured bitstrings to integers in one vectorized pass.
+
+    Args:
+        bitstrings: Iterable of bitstrings (register spaces allowed); shorter
+            keys are left-padded with zeros to the longest one
+
+    Returns:
+        np.ndarray: int64 array of the encoded states, in input order
+    """
+    keys = np.array(list(bitstrings), dtype=str)
+    if keys.size == 0:
+        return np.empty(0, np.int64)
+    keys = np.char.replace(keys, ' ', '')
+    n_bits = int(np.char.str_len(keys).max())
+    keys = np.char.zfill(keys, n_bits).astype(f'U{n_bits}')
+    bits = keys.view('U1').reshape(len(keys), n_bits) == '1'
+    return bits @ (1 << np.arange(n_bits - 1, -1, -1, dtype=np.int64))
+
+def fit_log_linear_decay(delays, probabilities, B=0.0):
+    """
+    Fit P = A*exp(-t/T1) + B with fixed B as a straight line in log space.
+
+    Returns (T1, T1_error, [A, T1, B]), or None if the data cannot be
+    fitted this way (too few points above B, a non-decaying slope, or
+    log(P - B) that is significantly curved, e.g. a floor other than B).
+    """
+    delays = np.asarray(delays, dtype=np.float64)
+    excess = np.asarray(probabilities, dtype=np.float64) - B
+    valid = excess > 0
+    if np.count_nonzero(valid) < 3:
+        return None
+
+    t = delays[valid]
+    y = np.log(excess[valid])
+    # Weight by sqrt(P - B): log-space noise grows as the population decays
+    w = np.sqrt(excess[valid])
+    A_mat = np.column_stack([np.ones_like(t), -t]) * w[:, None]
+    sol, *_ = np.linalg.lstsq(A_mat, y * w, rcond=None)
+    log_A, rate = sol
+    if rate <= 0:
+        return None
+
+    residuals = A_mat @ sol - y * w
+    residual_var = residuals @ residuals / max(len(t) - 2, 1)
+    rate_error = np.sqrt(np.linalg.inv(A_mat.T @ A_mat)[1, 1] * residual_var)
+
+    # A pure exponential is a straight line in log space. A significant
+    # quadratic term means the model (usually the fixed B) does not fit
+    if len(t) > 3:
+        Q_mat = np.column_stack([A_mat, t**2 * w])
+        q_sol, *_ = np.linalg.lstsq(Q_mat, y * w, rcond=None)
+        q_residuals = Q_mat @ q_sol - y * w
+        q_var = q_residuals @ q_residuals / max(len(t) - 3, 1)
+        curvature_error = np.sqrt(np.linalg.inv(Q_mat.T @ Q_mat)[2, 2] * q_var)
+        if abs(q_sol[2]) > 3 * curvature_error:
+            return None
+
+    T1_fit = 1.0 / rate
+    T1_error = rate_error / rate**2
+    return T1_fit, T1_error, np.array([np.exp(log_A), T1_fit, B])
+
+def configure_plotting():
+    # Scripts always save their plots; they are only displayed when SHOW_PLOTS is
+    # set. Otherwise select the non-interactive Agg backend, which skips GUI
+    # initialization and makes plt.show() a no-op. Call before importing pyplot.
+    show_plots = bool(os.environ.get('SHOW_PLOTS'))
+    if not show_plots:
+        import matplotlib
+        matplotlib.use('Agg')
+
+    return show_plots
+
+def run_t1_sweep(t1_exp, backend, shots, fast_fit=False):
+    # Run a T1 delay sweep and wait for it. On Aer the delay circuits execute in
+    # parallel (0 = use all cores) rather than the shots of each circuit. With
+    # fast_fit the framework curve fit is skipped; pass the result to fast_fit_t1.
+    if is_local_aer_backend(backend):
+        backend.set_options(max_parallel_experiments=0, max_parallel_threads=0,
+                            max_parallel_shots=1)
+
+    if fast_fit:
+        exp_data = t1_exp.run(backend, analysis=None, shots=shots, seed_simulator=42)
+    else:
+        exp_data = t1_exp.run(backend, shots=shots, seed_simulator=42)
+    exp_data.block_for_results()
+
+    return exp_data
+
+def fast_fit_t1(t1_exp, exp_data, delays):
+    # (fit, exp_data) for a sweep run with fast_fit. fit is the closed-form
+    # (T1, T1_error, [A, T1, B]) from the measured |1> populations. When they are
+    # not a pure decay to 0 (e.g. a readout floor) fit is None and exp_data comes
+    # back with the experiment's own curve-fit analysis run on it instead.
+    fit = fit_log_linear_decay(delays, get_excited_state_probabilities(exp_data.data()))
+    if fit is None:
+        exp_data = t1_exp.analysis.run(exp_data).block_for_results()
+
+    return fit, exp_data
 
-def optimize_circuit_on_backend(ansatz, observable, backend):
+def is_local_aer_backend(backend):
+    # Local simulators have no coherent hardware error for DD/twirling to suppress
+    return backend.__class__.__name__ == "AerSimulator"
 
-    pm = generate_preset_pass_manager(backend=backend, optimization_level=3)
-    isa_ansatz = pm.run(ansatz)
+@lru_cache(maxsize=None)
+def get_thermal_noise_model(t1_time=50e-6, n_qubits=5, gate_time=100e-9):
+    # Shared, built-once thermal relaxation model (T2 = T1, pure amplitude damping)
+    from qiskit.circuit import Delay
+    from qiskit_aer.noise import NoiseModel, RelaxationNoisePass, thermal_relaxation_error
+
+    t2_time = t1_time
+    noise_model = NoiseModel()
+
+    # Gates all take gate_time, so one global error covers every qubit
+    gate_error = thermal_relaxation_error(t1_time, t2_time, gate_time)
+    noise_model.add_all_qubit_quantum_error(gate_error, ['x', 'sx', 'rz', 'id'])
+
+    # Aer applies a registered error unchanged whatever the delay length, so
+    # delays get relaxation for their actual duration from a noise pass instead
+    # (the mechanism NoiseModel.from_backend uses)
+    noise_model._custom_noise_passes.append(RelaxationNoisePass(
+        t1s=[t1_time] * n_qubits, t2s=[t2_time] * n_qubits, op_types=Delay
+    ))
+
+    return noise_model
+
+def pick_best_pair(backend):
+    # Coupled qubit pair with the lowest two-qubit gate + readout error, or None
+    # when the backend has no coupling map / error data (e.g. a local simulator)
+    target = getattr(backend, "target", None)
+    coupling_map = getattr(backend, "coupling_map", None)
+    if target is None or coupling_map is None:
+        return None
+    two_qubit_gate = next((g for g in ("cx", "ecr", "cz") if g in target.operation_names), None)
+    if two_qubit_gate is None:
+        return None
+
+    def error(gate, qargs):
+        props = target[gate].get(qargs) if gate in target.operation_names else None
+        return props.error if props is not None and props.error is not None else 0.0
+
+    edges = list(coupling_map.get_edges())
+    if not edges:
+        return None
+    errors = [error(two_qubit_gate, (a, b)) + error("measure", (a,)) + error("measure", (b,))
+              for a, b in edges]
+
+    return list(edges[int(np.argmin(errors))])
+
+def _circuit_description(circuit):
+    # Text form of a circuit that is stable across processes: op names, bit indices
+    # and parameter names only (QPY would embed the random Parameter UUIDs).
+    # Non-standard gates such as TwoLocal are expanded so their structure counts.
+    standard_gates = get_standard_gate_name_mapping()
+    lines = [f"{circuit.num_qubits} {circuit.num_clbits}"]
+    for instr in circuit.data:
+        op = instr.operation
+        qubits = tuple(circuit.find_bit(q).index for q in instr.qubits)
+        clbits = tuple(circuit.find_bit(c).index for c in instr.clbits)
+        lines.append(f"{op.name} {qubits} {clbits} {[str(p) for p in op.params]}")
+        if op.name not in standard_gates and getattr(op, "definition", None) is not None:
+            lines.append("{" + _circuit_description(op.definition) + "}")
+
+    return "\n".join(lines)
+
+def _transpile_cache_key(ansatz, backend, optimization_level, initial_layout=None):
+    # Hash the ansatz structure together with everything the transpiler output depends on
+    key = hashlib.sha256(_circuit_description(ansatz).encode())
+    version = getattr(backend, "backend_version", getattr(backend, "version", None))
+    key.update(repr((backend.name, version, optimization_level, initial_layout)).encode())
+
+    # A new calibration can change the best layout, so it invalidates the entry
+    properties = backend.properties() if callable(getattr(backend, "properties", None)) else None
+    if properties is not None:
+        key.update(str(properties.last_update_date).encode())
+
+    return key.hexdigest()
+
+def optimize_circuit_on_backend(ansatz, observable, backend, optimization_level=3, initial_layout=None):
+
+    # Transpiling a fixed ansatz for a fixed backend is deterministic, so reuse
+    # the ISA circuit (with its layout) from a previous run when there is one
+    cache_file = os.path.join(TRANSPILE_CACHE_DIR,
+                              _transpile_cache_key(ansatz, backend, optimization_level, initial_layout) + ".qpy")
+    isa_ansatz = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                isa_ansatz = qpy.load(f)[0]
+        except Exception:
+            # Unreadable entry (e.g. from another qiskit version): transpile again
+            isa_ansatz = None
+
+    if isa_ansatz is None:
+        pm = generate_preset_pass_manager(backend=backend, optimization_level=optimization_level,
+                                          initial_layout=initial_layout)
+        isa_ansatz = pm.run(ansatz)
+        os.makedirs(TRANSPILE_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file and move it into place, so an interrupted
+        # run never leaves a truncated entry behind
+        fd, tmp_file = tempfile.mkstemp(dir=TRANSPILE_CACHE_DIR, suffix=".qpy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                qpy.dump(isa_ansatz, f)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+
+    # Applying the layout is cheap and keeps the cache independent of the observable
     isa_observable = observable.apply_layout(layout = isa_ansatz.layout)
 
-    return isa_ansatz, isa_observable
\ No newline at end of file
+    return isa_ansatz, isa_observable
+
+def get_excited_state_probabilities(data):
+    # P(|1>) for every datum of an experiment (e.g. exp_data.data()), one per delay
+    counts = [datum['counts'] if isinstance(datum, dict) else datum.counts for datum in data]
+    ones = np.fromiter((c.get('1', 0) for c in counts), dtype=np.int64, count=len(counts))
+    totals = np.fromiter((sum(c.values()) for c in counts), dtype=np.int64, count=len(counts))
+
+    return ones / np.maximum(totals, 1)